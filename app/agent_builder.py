@@ -1,12 +1,21 @@
-from typing import List, Optional
+import atexit
+import contextlib
+import json
+import logging
+import threading
+import time
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
 
 from strands import Agent, tool
 from strands.models import BedrockModel
 from strands_tools import http_request
 
 from .prompts import SYSTEM_PROMPT
-from .ddb_tools import save_itinerary, get_itineraries
-from .config import MODEL_ID, AWS_REGION, GATEWAY_URL, get_gateway_access_token, log, new_uuid
+from .ddb_tools import save_itinerary, get_itineraries, get_itinerary_detail
+from .config import (
+    MODEL_ID, MAX_TOKENS, STOP_SEQUENCES, AWS_REGION, GATEWAY_URL, GATEWAY_TOOL_TIMEOUT, get_gateway_access_token, log, new_uuid,
+)
 
 try:
     from strands.agent.conversation_manager import SlidingWindowConversationManager
@@ -22,6 +31,16 @@ except Exception:
     streamablehttp_client = None  # type: ignore
     log.warning("MCP client libraries not available; gateway tools will be skipped.")
 
+TOOLS_CACHE_TTL = 300
+TOOLS_CACHE_FAILURE_TTL = 30
+
+_TOOLS_CACHE = {"url": None, "tools": None, "exp": 0.0}
+
+
+def _invalidate_tools_cache() -> None:
+    _TOOLS_CACHE["tools"] = None
+    _TOOLS_CACHE["exp"] = 0.0
+
 
 def _mcp_client_or_none() -> Optional[MCPClient]:  # type: ignore
     if not (MCPClient and streamablehttp_client):
@@ -30,7 +49,7 @@ def _mcp_client_or_none() -> Optional[MCPClient]:  # type: ignore
     if not GATEWAY_URL:
         log.debug("[gateway] GATEWAY_URL unset; skipping gateway tools")
         return None
-    log.debug(f"[gateway] preparing MCP client for {GATEWAY_URL}")
+    log.debug("[gateway] preparing MCP client for %s", GATEWAY_URL)
     token = get_gateway_access_token()
     if not token:
         log.warning("[gateway] no access token available; proceeding without gateway tools")
@@ -43,58 +62,191 @@ def _mcp_client_or_none() -> Optional[MCPClient]:  # type: ignore
     return client
 
 
+_MCP_SINGLETON = {"client": None, "session": None, "token": None}
+_MCP_LOCK = threading.Lock()
+# Callers currently inside a call, per client (keyed by id), and clients that were
+# replaced while still in use; those are closed when their last caller returns.
+_MCP_REFS: Dict[int, int] = {}
+_MCP_RETIRED: Dict[int, Any] = {}
+
+
+def _exit_mcp_client(client) -> None:
+    try:
+        client.__exit__(None, None, None)
+    except Exception:
+        log.debug("[gateway] error while closing MCP session", exc_info=True)
+
+
+def _retire_current_session() -> Optional[Any]:
+    """
+    Detach the current client. Returns it if nobody is using it (the caller exits it
+    outside the lock); otherwise it is parked until its in-flight calls finish.
+    Callers must hold _MCP_LOCK.
+    """
+    client = _MCP_SINGLETON["client"]
+    _MCP_SINGLETON.update(client=None, session=None, token=None)
+    if client is None:
+        return None
+    if _MCP_REFS.get(id(client)):
+        _MCP_RETIRED[id(client)] = client
+        return None
+    return client
+
+
+def _release_mcp_client(client) -> None:
+    with _MCP_LOCK:
+        key = id(client)
+        refs = _MCP_REFS.get(key, 0) - 1
+        if refs > 0:
+            _MCP_REFS[key] = refs
+            return
+        _MCP_REFS.pop(key, None)
+        retired = _MCP_RETIRED.pop(key, None)
+    if retired is not None:
+        _exit_mcp_client(retired)
+
+
+def _close_mcp_session(expected=None) -> None:
+    """
+    Retire the shared MCP session (if any). Safe to call repeatedly.
+    If `expected` is given, only retire it when it is still the current session, so a
+    caller holding a stale session can't tear down one that others are using.
+    """
+    with _MCP_LOCK:
+        if expected is not None and _MCP_SINGLETON["session"] is not expected:
+            return
+        client = _retire_current_session()
+    if client is not None:
+        _exit_mcp_client(client)
+
+
+def _close_all_mcp_sessions() -> None:
+    with _MCP_LOCK:
+        clients = [_MCP_SINGLETON["client"], *_MCP_RETIRED.values()]
+        _MCP_SINGLETON.update(client=None, session=None, token=None)
+        _MCP_RETIRED.clear()
+    for client in clients:
+        if client is not None:
+            _exit_mcp_client(client)
+
+
+atexit.register(_close_all_mcp_sessions)
+
+
+@contextlib.contextmanager
+def _mcp_session():
+    """
+    Check out the process-wide MCP session for one call, opening it on first use.
+    When the gateway access token rotates, later callers get a new session; the old one
+    stays open until its in-flight calls return (the old token is still valid for at
+    least TOKEN_REFRESH_LEAD_SECONDS).
+    """
+    token = get_gateway_access_token()
+    stale = None
+    try:
+        with _MCP_LOCK:
+            if _MCP_SINGLETON["session"] is not None and token != _MCP_SINGLETON["token"]:
+                log.debug("[gateway] access token rotated; reopening MCP session")
+                stale = _retire_current_session()
+            if _MCP_SINGLETON["session"] is None:
+                new_client = _mcp_client_or_none()
+                if new_client is not None:
+                    _MCP_SINGLETON.update(client=new_client, session=new_client.__enter__(), token=token)
+                    log.debug("[gateway] MCP session opened")
+            client, session = _MCP_SINGLETON["client"], _MCP_SINGLETON["session"]
+            if client is not None:
+                _MCP_REFS[id(client)] = _MCP_REFS.get(id(client), 0) + 1
+    finally:
+        if stale is not None:
+            _exit_mcp_client(stale)
+    try:
+        yield session
+    finally:
+        if client is not None:
+            _release_mcp_client(client)
+
+
+_WRAPPED_TOOLS: Dict[tuple, Any] = {}
+
+
 def _wrap_mcp_tool(tool_name: str, schema: dict | None, description: str | None):
     """
     Create a Strands tool wrapper that proxies calls to the Gateway MCP tool.
+    Wrappers are memoized by (name, schema, description) so rediscovery reuses them.
     """
     schema = schema or {"type": "object", "properties": {}}
     description = description or f"MCP tool proxy for {tool_name}"
+    cache_key = (tool_name, json.dumps(schema, sort_keys=True, default=str), description)
+    cached = _WRAPPED_TOOLS.get(cache_key)
+    if cached is not None:
+        return cached
 
     @tool(name=tool_name, description=description, inputSchema=schema, context="tool_context")
     def _gateway_proxy(*, tool_context: dict, **kwargs):
-        client = _mcp_client_or_none()
-        if client is None:
-            raise RuntimeError("Gateway client unavailable")
         tool_use_id = tool_context.get("tool_use", {}).get("toolUseId") or new_uuid()
         arguments = kwargs or None
-        try:
-            with client as mcp:
-                result = mcp.call_tool_sync(tool_use_id=tool_use_id, name=tool_name, arguments=arguments)
-        except Exception as exc:
-            log.exception("[gateway] tool %s failed", tool_name)
-            raise
-        return result
-
-    log.debug(f"[gateway] wrapped MCP tool {tool_name}")
+        with _mcp_session() as mcp:
+            if mcp is None:
+                raise RuntimeError("Gateway client unavailable")
+            try:
+                return mcp.call_tool_sync(
+                    tool_use_id=tool_use_id,
+                    name=tool_name,
+                    arguments=arguments,
+                    read_timeout_seconds=timedelta(seconds=GATEWAY_TOOL_TIMEOUT),
+                )
+            except Exception:
+                log.exception("[gateway] tool %s failed", tool_name)
+                _close_mcp_session(mcp)
+                _invalidate_tools_cache()
+                raise
+
+    log.debug("[gateway] wrapped MCP tool %s", tool_name)
+    _WRAPPED_TOOLS[cache_key] = _gateway_proxy
     return _gateway_proxy
 
 
+def gateway_tools_cached() -> bool:
+    """
+    True once a tool list for the current gateway URL has been cached (even if stale),
+    i.e. a slow discovery can fall back to the baseline agent without losing much.
+    """
+    return _TOOLS_CACHE["url"] == GATEWAY_URL and _TOOLS_CACHE["tools"] is not None
+
+
 def discover_gateway_tools() -> List:
     """
     Return a list of MCP tool descriptors if gateway access is available, else [].
+    Results are cached per gateway URL for TOOLS_CACHE_TTL seconds; failures are
+    cached briefly (TOOLS_CACHE_FAILURE_TTL) so a flapping gateway isn't hammered.
     """
+    if _TOOLS_CACHE["url"] == GATEWAY_URL and time.time() < _TOOLS_CACHE["exp"]:
+        log.debug("[gateway] using cached tool list")
+        return _TOOLS_CACHE["tools"]
+
     log.debug("[gateway] attempting to discover available tools")
-    client = _mcp_client_or_none()
-    if not client:
-        log.debug("[gateway] MCP client unavailable; returning no extra tools")
-        return []
     try:
-        with client as mcp:
-            tools = mcp.list_tools_sync()
-            log.debug(f"[gateway] list_tools_sync returned {len(tools or [])} record(s)")
+        with _mcp_session() as mcp:
+            if mcp is None:
+                log.debug("[gateway] MCP client unavailable; returning no extra tools")
+                return []
+            try:
+                tools = mcp.list_tools_sync()
+            except Exception:
+                _close_mcp_session(mcp)
+                raise
+        log.debug("[gateway] list_tools_sync returned %d record(s)", len(tools or []))
     except Exception:
         log.exception("[gateway] failed to list tools")
+        _TOOLS_CACHE.update(url=GATEWAY_URL, tools=[], exp=time.time() + TOOLS_CACHE_FAILURE_TTL)
         return []
 
-    names = []
-    for t in tools or []:
-        name = getattr(t, "tool_name", None)
-        if isinstance(name, str):
-            names.append(name)
-    if names:
-        log.info(f"[gateway] tools discovered: {names}")
-    else:
-        log.info("[gateway] list_tools_sync returned no named tools")
+    if log.isEnabledFor(logging.INFO):
+        names = [n for n in (getattr(t, "tool_name", None) for t in tools or []) if isinstance(n, str)]
+        if names:
+            log.info("[gateway] tools discovered: %s", names)
+        else:
+            log.info("[gateway] list_tools_sync returned no named tools")
 
     wrapped_tools: List = []
     for tool_desc in tools or []:
@@ -108,21 +260,32 @@ def discover_gateway_tools() -> List:
             wrapped_tools.append(_wrap_mcp_tool(name, schema, description))
         except Exception:
             log.exception("[gateway] failed to wrap tool %s", getattr(tool_desc, "tool_name", "<unknown>"))
+
+    _TOOLS_CACHE.update(url=GATEWAY_URL, tools=wrapped_tools, exp=time.time() + TOOLS_CACHE_TTL)
     return wrapped_tools
 
 
+_model_kwargs = dict(
+    model_id=MODEL_ID,
+    region_name=AWS_REGION,
+    max_tokens=MAX_TOKENS,
+    temperature=0.2,
+    streaming=True,
+    include_tool_result_status=True,
+)
+if STOP_SEQUENCES:
+    _model_kwargs["stop_sequences"] = STOP_SEQUENCES
+
+_MODEL = BedrockModel(**_model_kwargs)
+
+
 def build_agent(extra_tools: Optional[List] = None) -> Agent:
-    log.debug(f"[agent] building agent with {len(extra_tools or [])} gateway tool(s)")
-    model = BedrockModel(
-        model_id=MODEL_ID,
-        region_name=AWS_REGION,
-        max_tokens=15000,
-        temperature=0.2,
-    )
+    log.debug("[agent] building agent with %d gateway tool(s)", len(extra_tools or []))
+    model = _MODEL
 
-    tools = [http_request, save_itinerary, get_itineraries]
+    tools = [http_request, save_itinerary, get_itineraries, get_itinerary_detail]
     if extra_tools:
-        log.debug(f"[agent] appending {len(extra_tools)} gateway tool(s) to baseline set")
+        log.debug("[agent] appending %d gateway tool(s) to baseline set", len(extra_tools))
         tools.extend(extra_tools)
     else:
         log.debug("[agent] using baseline tool set only")
@@ -1,11 +1,13 @@
 import os
 import logging
 import uuid
-import datetime
 import time
+import threading
 
 import boto3
+from botocore.config import Config
 import requests
+from requests.adapters import HTTPAdapter
 
 logging.basicConfig(
     level=os.getenv("LOG_LEVEL", "DEBUG"),
@@ -13,10 +15,19 @@ logging.basicConfig(
 )
 log = logging.getLogger("agentcore-poc")
 
-AWS_REGION = os.getenv("AWS_REGION") or boto3.session.Session().region_name or "us-east-1"
+# Skip per-record process/thread lookups; the log format doesn't use them.
+logging.logProcesses = False
+logging.logThreads = False
+logging.logMultiprocessing = False
+
+_boto_session = boto3.session.Session()
+
+AWS_REGION = os.getenv("AWS_REGION") or _boto_session.region_name or "us-east-1"
 DDB_REGION = os.getenv("DDB_REGION", AWS_REGION)
 TABLE_NAME = os.getenv("TABLE_NAME", "travel_itineraries")
 MODEL_ID   = os.getenv("MODEL_ID", "us.anthropic.claude-3-7-sonnet-20250219-v1:0")
+MAX_TOKENS = int(os.getenv("MAX_TOKENS", "4000"))
+STOP_SEQUENCES = [s for s in os.getenv("STOP_SEQUENCES", "").split(",") if s]
 
 GATEWAY_URL = os.getenv("GATEWAY_URL", "https://travel-agent-gateway-ugbk5bivzz.gateway.bedrock-agentcore.us-east-1.amazonaws.com/mcp")
 GATEWAY_ACCESS_TOKEN = os.getenv("GATEWAY_ACCESS_TOKEN", "")
@@ -24,19 +35,36 @@ COGNITO_TOKEN_URL = os.getenv("COGNITO_TOKEN_URL", "https://my-domain-grsxuvl5.a
 COGNITO_CLIENT_ID = os.getenv("COGNITO_CLIENT_ID", "your_client_id")
 COGNITO_CLIENT_SECRET = os.getenv("COGNITO_CLIENT_SECRET", "your_client_secret")
 COGNITO_SCOPE = os.getenv("COGNITO_SCOPE", "")
+GATEWAY_TOOL_TIMEOUT = float(os.getenv("GATEWAY_TOOL_TIMEOUT", "60"))
+TOOL_DISCOVERY_TIMEOUT = float(os.getenv("TOOL_DISCOVERY_TIMEOUT", "2.0"))
 
 HTTP_MAX_CALLS = int(os.getenv("HTTP_MAX_CALLS", "8"))
 
-dynamodb = boto3.resource("dynamodb", region_name=DDB_REGION)
+_ddb_cfg = Config(
+    max_pool_connections=int(os.getenv("DDB_MAX_POOL_CONNECTIONS", "64")),
+    retries={"max_attempts": 5, "mode": "adaptive"},
+    connect_timeout=3,
+    read_timeout=5,
+    tcp_keepalive=True,
+)
+dynamodb = _boto_session.resource("dynamodb", region_name=DDB_REGION, config=_ddb_cfg)
 table = dynamodb.Table(TABLE_NAME)
 
 def iso_now() -> str:
-    return datetime.datetime.utcnow().isoformat()
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime())
 
 def new_uuid() -> str:
-    return str(uuid.uuid4())
+    return uuid.uuid4().hex
 
 _token_cache = {"access_token": None, "exp": 0}
+_token_lock = threading.Lock()
+_refresher = {"thread": None}
+_cognito_session = requests.Session()
+_cognito_session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=4))
+_cognito_session.headers["Connection"] = "keep-alive"
+
+TOKEN_REFRESH_LEAD_SECONDS = 60
+TOKEN_REFRESH_RETRY_SECONDS = 30
 
 def _mint_cognito_token() -> str:
     if not (COGNITO_TOKEN_URL and COGNITO_CLIENT_ID and COGNITO_CLIENT_SECRET):
@@ -44,7 +72,7 @@ def _mint_cognito_token() -> str:
     auth = (COGNITO_CLIENT_ID, COGNITO_CLIENT_SECRET)
     data = {"grant_type": "client_credentials", "scope": COGNITO_SCOPE or ""}
     try:
-        resp = requests.post(COGNITO_TOKEN_URL, data=data, auth=auth, timeout=10)
+        resp = _cognito_session.post(COGNITO_TOKEN_URL, data=data, auth=auth, timeout=10)
         resp.raise_for_status()
     except Exception:
         log.warning("[gateway] failed to mint token via Cognito", exc_info=True)
@@ -52,12 +80,34 @@ def _mint_cognito_token() -> str:
     payload = resp.json()
     _token_cache["access_token"] = payload.get("access_token")
     _token_cache["exp"] = int(time.time()) + int(payload.get("expires_in", 300)) - 30
+    _start_token_refresher()
     return _token_cache["access_token"] or ""
 
+def _refresh_token_loop() -> None:
+    """
+    Re-mint the Cognito token shortly before it expires so requests never wait on it.
+    """
+    while True:
+        delay = _token_cache["exp"] - TOKEN_REFRESH_LEAD_SECONDS - time.time()
+        time.sleep(max(delay, TOKEN_REFRESH_RETRY_SECONDS))
+        with _token_lock:
+            if time.time() < _token_cache["exp"] - TOKEN_REFRESH_LEAD_SECONDS:
+                continue
+            if _mint_cognito_token():
+                log.debug("[gateway] refreshed Cognito token in background")
+
+def _start_token_refresher() -> None:
+    if _refresher["thread"] is not None:
+        return
+    _refresher["thread"] = threading.Thread(target=_refresh_token_loop, name="cognito-token-refresh", daemon=True)
+    _refresher["thread"].start()
+
 def get_gateway_access_token() -> str:
     if GATEWAY_ACCESS_TOKEN:
         return GATEWAY_ACCESS_TOKEN
-    now = int(time.time())
-    if _token_cache["access_token"] and now < _token_cache["exp"]:
+    if _token_cache["access_token"] and int(time.time()) < _token_cache["exp"]:
         return _token_cache["access_token"]
-    return _mint_cognito_token()
+    with _token_lock:
+        if _token_cache["access_token"] and int(time.time()) < _token_cache["exp"]:
+            return _token_cache["access_token"]
+        return _mint_cognito_token()
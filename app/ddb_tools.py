@@ -1,16 +1,52 @@
 from typing import Dict, Any, List
+import collections
+import functools
+import threading
 import uuid
 
 from botocore.exceptions import ClientError
 from boto3.dynamodb.conditions import Key
 
 from strands import tool
-from .config import table, iso_now, log
+from .config import table, iso_now, log, new_uuid
 
+SAVED_IDS_CACHE_SIZE = 4096
 
-def _ensure_itinerary_shape(itinerary: Dict[str, Any]) -> Dict[str, Any]:
-    it = dict(itinerary or {})
-    it.setdefault("itineraryId", str(uuid.uuid4()))
+_USER_KEY = Key("userId")
+_SUMMARY_FIELDS = ("itineraryId", "destination", "startDate", "endDate", "createdAt")
+ITINERARY_SUMMARY_PROJECTION = ",".join(f"#f{i}" for i in range(len(_SUMMARY_FIELDS)))
+ITINERARY_SUMMARY_NAMES = {f"#f{i}": name for i, name in enumerate(_SUMMARY_FIELDS)}
+
+# (userId, itineraryId) pairs known to exist in the table. Writes are conditional on
+# attribute_not_exists, so a hit here is exactly what DynamoDB would answer.
+_saved_ids: "collections.OrderedDict[tuple, None]" = collections.OrderedDict()
+_saved_ids_lock = threading.Lock()
+
+
+def _remember_saved(user_id: str, itinerary_id: str) -> None:
+    with _saved_ids_lock:
+        _saved_ids[(user_id, itinerary_id)] = None
+        _saved_ids.move_to_end((user_id, itinerary_id))
+        if len(_saved_ids) > SAVED_IDS_CACHE_SIZE:
+            _saved_ids.popitem(last=False)
+
+
+def _known_saved(user_id: str, itinerary_id: str) -> bool:
+    with _saved_ids_lock:
+        return (user_id, itinerary_id) in _saved_ids
+
+
+def _ensure_itinerary_shape(itinerary: Dict[str, Any], *, copy: bool = False) -> Dict[str, Any]:
+    """
+    Fill in missing itinerary fields. Mutates `itinerary` in place unless copy=True.
+    """
+    if itinerary is None:
+        it = {}
+    elif not isinstance(itinerary, dict):
+        raise ValueError(f"itinerary must be a JSON object, got {type(itinerary).__name__}")
+    else:
+        it = dict(itinerary) if copy else itinerary
+    it.setdefault("itineraryId", new_uuid())
     it.setdefault("destination", "")
     it.setdefault("startDate", "")
     it.setdefault("endDate", "")
@@ -19,6 +55,7 @@ def _ensure_itinerary_shape(itinerary: Dict[str, Any]) -> Dict[str, Any]:
     return it
 
 
+@functools.lru_cache(maxsize=1024)
 def _stable_itinerary_id(user_id: str, destination: str, start: str, end: str, request_id: str = "") -> str:
     base = request_id or f"{user_id}|{destination}|{start}|{end}"
     return str(uuid.uuid5(uuid.NAMESPACE_URL, f"agentcore-poc:{base}"))
@@ -40,17 +77,22 @@ def save_itinerary(userId: str, itinerary: Dict[str, Any], requestId: str = "")
     )
     it["createdAt"] = iso_now()
 
-    log.info(f"[tool] save_itinerary(userId={userId}, itineraryId={it['itineraryId']})")
+    log.info("[tool] save_itinerary(userId=%s, itineraryId=%s)", userId, it["itineraryId"])
+    if _known_saved(userId, it["itineraryId"]):
+        log.info("[tool] save_itinerary -> duplicate:%s (cached)", it["itineraryId"])
+        return f"duplicate:{it['itineraryId']}"
     try:
         table.put_item(
             Item=it,
             ConditionExpression="attribute_not_exists(itineraryId)"
         )
-        log.info(f"[tool] save_itinerary -> saved:{it['itineraryId']}")
+        _remember_saved(userId, it["itineraryId"])
+        log.info("[tool] save_itinerary -> saved:%s", it["itineraryId"])
         return f"saved:{it['itineraryId']}"
     except ClientError as e:
         if e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
-            log.info(f"[tool] save_itinerary -> duplicate:{it['itineraryId']}")
+            _remember_saved(userId, it["itineraryId"])
+            log.info("[tool] save_itinerary -> duplicate:%s", it["itineraryId"])
             return f"duplicate:{it['itineraryId']}"
         log.exception("[tool] save_itinerary error")
         raise
@@ -58,12 +100,30 @@ def save_itinerary(userId: str, itinerary: Dict[str, Any], requestId: str = "")
 
 @tool
 def get_itineraries(userId: str, limit: int = 10) -> List[Dict[str, Any]]:
-    log.info(f"[tool] get_itineraries(userId={userId}, limit={limit})")
+    """
+    List a user's recent itineraries (summary fields only; use get_itinerary_detail for the full plan).
+    """
+    log.info("[tool] get_itineraries(userId=%s, limit=%s)", userId, limit)
     resp = table.query(
-        KeyConditionExpression=Key("userId").eq(userId),
+        KeyConditionExpression=_USER_KEY.eq(userId),
         Limit=limit,
-        ScanIndexForward=False
+        ScanIndexForward=False,
+        ProjectionExpression=ITINERARY_SUMMARY_PROJECTION,
+        ExpressionAttributeNames=ITINERARY_SUMMARY_NAMES,
+        ConsistentRead=False,
     )
     items = resp.get("Items", [])
-    log.info(f"[tool] get_itineraries -> {len(items)} item(s)")
+    log.info("[tool] get_itineraries -> %d item(s)", len(items))
     return items
+
+
+@tool
+def get_itinerary_detail(userId: str, itineraryId: str) -> Dict[str, Any]:
+    """
+    Fetch one full itinerary (all days, activities and sources). Returns {} if not found.
+    """
+    log.info("[tool] get_itinerary_detail(userId=%s, itineraryId=%s)", userId, itineraryId)
+    resp = table.get_item(Key={"userId": userId, "itineraryId": itineraryId})
+    item = resp.get("Item") or {}
+    log.info("[tool] get_itinerary_detail -> %s", "found" if item else "missing")
+    return item
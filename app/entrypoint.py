@@ -1,47 +1,81 @@
-import uuid
 import traceback
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, AsyncIterator, Dict, List
 
 from bedrock_agentcore.runtime import BedrockAgentCoreApp
 
-from .agent_builder import build_agent, discover_gateway_tools
-from .config import log, AWS_REGION, DDB_REGION
+from .agent_builder import build_agent, discover_gateway_tools, gateway_tools_cached
+from .jobs import mirror_progress
+from .config import log, AWS_REGION, DDB_REGION, GATEWAY_TOOL_TIMEOUT, TOOL_DISCOVERY_TIMEOUT, new_uuid
 
 app = BedrockAgentCoreApp()
-_baseline_agent = build_agent()
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="invoke-prep")
 
 log.setLevel("DEBUG")
 
 
-def _agent_for_request():
-    extra_tools = discover_gateway_tools()
+def _agent_for_request(extra_tools: List):
+    """
+    Build a fresh Agent per request so conversation history never crosses requests.
+    The model and gateway tool wrappers are shared, so this is cheap.
+    """
     if not extra_tools:
-        log.debug("[invoke] using baseline agent (no gateway tools available)")
-        return _baseline_agent
-    log.debug(f"[invoke] rebuilding agent with {len(extra_tools)} gateway tool(s)")
+        log.debug("[invoke] using baseline tool set (no gateway tools available)")
+        return build_agent()
+    log.debug("[invoke] building agent with %d gateway tool(s)", len(extra_tools))
     try:
         return build_agent(extra_tools=extra_tools)
     except Exception:
         log.exception("[gateway] failed to build agent with extra tools; falling back to baseline")
-        return _baseline_agent
+        return build_agent()
+
+
+def _error_response(exc: Exception, user_id: str, request_id: str) -> Dict[str, Any]:
+    return {
+        "result": "error",
+        "error": str(exc),
+        "trace": traceback.format_exc()[:3800],
+        "userId": user_id,
+        "requestId": request_id,
+    }
+
+
+async def _stream_agent(agent, prompt: str, user_id: str, request_id: str) -> AsyncIterator[Any]:
+    """
+    Yield text chunks as the model produces them; BedrockAgentCoreApp sends each as an SSE frame.
+    """
+    with mirror_progress(user_id, request_id):
+        try:
+            async for event in agent.stream_async(prompt):
+                if "data" in event:
+                    yield event["data"]
+        except Exception as exc:
+            log.error("[invoke] error", exc_info=True)
+            yield _error_response(exc, user_id, request_id)
 
 
 @app.entrypoint
 def invoke(payload: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Payload keys: userId, requestId, prompt, destination, startDate, endDate, preferences
+    Payload keys: userId, requestId, prompt, destination, startDate, endDate, preferences, stream
+    With "stream": true the response is an SSE stream of model text instead of one JSON body.
     """
-    user_id = payload.get("userId", f"u-{uuid.uuid4()}")
-    request_id = payload.get("requestId", str(uuid.uuid4()))
+    # Gateway discovery (token mint + MCP list_tools) overlaps with prompt assembly below.
+    # Only bound it tightly once a tool list has been seen; a cold start waits for it.
+    discovery_timeout = TOOL_DISCOVERY_TIMEOUT if gateway_tools_cached() else GATEWAY_TOOL_TIMEOUT
+    tools_future = _executor.submit(discover_gateway_tools)
+
+    user_id = payload.get("userId", f"u-{new_uuid()}")
+    request_id = payload.get("requestId", new_uuid())
     destination = payload.get("destination", "")
     start_date = payload.get("startDate", "")
     end_date = payload.get("endDate", "")
     prefs = payload.get("preferences", "")
     nl_query = payload.get("prompt") or f"Plan a trip to {destination} from {start_date} to {end_date}. Preferences: {prefs}"
 
-    log.info(f"[invoke] userId={user_id} requestId={request_id} region={AWS_REGION} ddb_region={DDB_REGION}")
-    log.info(f"[invoke] nl_query={nl_query}")
-    log.debug(f"[invoke] destination={destination} start={start_date} end={end_date} prefs={prefs}")
+    log.info("[invoke] userId=%s requestId=%s region=%s ddb_region=%s", user_id, request_id, AWS_REGION, DDB_REGION)
+    log.info("[invoke] nl_query=%s", nl_query)
+    log.debug("[invoke] destination=%s start=%s end=%s prefs=%s", destination, start_date, end_date, prefs)
 
     context = (
         f"UserId: {user_id}\n"
@@ -52,10 +86,22 @@ def invoke(payload: Dict[str, Any]) -> Dict[str, Any]:
         "Follow the protocol; emit STATUS/TOOL lines; call save_itinerary exactly once."
     )
 
-    agent = _agent_for_request()
+    try:
+        extra_tools = tools_future.result(timeout=discovery_timeout)
+    except FutureTimeout:
+        log.warning("[invoke] gateway tool discovery exceeded %.1fs; using baseline agent", discovery_timeout)
+        extra_tools = []
+    except Exception:
+        log.exception("[invoke] gateway tool discovery failed; using baseline agent")
+        extra_tools = []
+    agent = _agent_for_request(extra_tools)
+
+    if payload.get("stream"):
+        return _stream_agent(agent, f"{context}\n\nUser request: {nl_query}", user_id, request_id)
 
     try:
-        result = agent(f"{context}\n\nUser request: {nl_query}")
+        with mirror_progress(user_id, request_id):
+            result = agent(f"{context}\n\nUser request: {nl_query}")
         return {
             "result": "ok",
             "userId": user_id,
@@ -64,13 +110,7 @@ def invoke(payload: Dict[str, Any]) -> Dict[str, Any]:
         }
     except Exception as exc:
         log.error("[invoke] error", exc_info=True)
-        return {
-            "result": "error",
-            "error": str(exc),
-            "trace": traceback.format_exc()[:3800],
-            "userId": user_id,
-            "requestId": request_id,
-        }
+        return _error_response(exc, user_id, request_id)
 
 
 if __name__ == "__main__":
@@ -1,13 +1,26 @@
 from __future__ import annotations
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
+import collections
+import json
 import time
+import contextlib
+import contextvars
 import logging
+import logging.handlers
+import queue
+import threading
+import zlib
 
 from botocore.exceptions import ClientError
 from .config import table, iso_now, log
 
 JOB_SK_PREFIX = "job#"
 
+PROGRESS_FLUSH_INTERVAL = 0.2
+PROGRESS_FLUSH_MAX_LINES = 20
+PROGRESS_MAX_ENTRIES = 200
+PROGRESS_RING_REWRITE_LINES = 50
+
 def _job_sk(request_id: str) -> str:
     return f"{JOB_SK_PREFIX}{request_id}"
 
@@ -15,13 +28,14 @@ def create_job(user_id: str, request_id: str, meta: Optional[Dict[str, Any]] = N
     """
     Create a job record (idempotent). PK=userId, SK=job#<requestId>.
     """
+    now = iso_now()
     item = {
         "userId": user_id,
         "itineraryId": _job_sk(request_id),  
         "type": "job",
         "status": "RUNNING",
-        "startedAt": iso_now(),
-        "updatedAt": iso_now(),
+        "startedAt": now,
+        "updatedAt": now,
         "progress": [],
     }
     if meta:
@@ -34,17 +48,128 @@ def create_job(user_id: str, request_id: str, meta: Optional[Dict[str, Any]] = N
             Item=item,
             ConditionExpression="attribute_not_exists(itineraryId)"
         )
-        log.info(f"[job] created userId={user_id} requestId={request_id}")
+        log.info("[job] created userId=%s requestId=%s", user_id, request_id)
     except ClientError as e:
         if e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
-            log.info(f"[job] already exists userId={user_id} requestId={request_id}")
+            log.info("[job] already exists userId=%s requestId=%s", user_id, request_id)
         else:
             log.exception("[job] create_job error")
             raise
 
+_progress_buffer: Dict[Tuple[str, str], List[str]] = {}
+_progress_lock = threading.Lock()
+_progress_write_lock = threading.Lock()
+_progress_wakeup = threading.Event()
+_progress_flusher = {"thread": None}
+_progress_state: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+def _write_progress(user_id: str, request_id: str, lines: List[str], final: bool = False) -> None:
+    """
+    Append a batch of progress lines in a single update_item.
+    Once a job passes PROGRESS_MAX_ENTRIES lines, `progress` is trimmed back to a ring of
+    the most recent entries every PROGRESS_RING_REWRITE_LINES lines (and on the final
+    write). Evicted lines are spilled PROGRESS_MAX_ENTRIES at a time into numbered
+    `progress_overflow_<n>` attributes (zlib'd JSON). `progressCount` tracks the total so
+    readers can tell how many lines are new once the list has been trimmed.
+    Callers must hold _progress_write_lock.
+    """
+    state = _progress_state.setdefault(
+        (user_id, request_id),
+        {
+            "count": 0,
+            "ring": collections.deque(maxlen=PROGRESS_MAX_ENTRIES),
+            "spill": [],
+            "chunks": 0,
+            "since_rewrite": 0,
+        },
+    )
+    ring = state["ring"]
+    for line in lines:
+        if len(ring) == ring.maxlen:
+            state["spill"].append(ring[0])
+        ring.append(line)
+    state["count"] += len(lines)
+    if state["count"] > PROGRESS_MAX_ENTRIES:
+        state["since_rewrite"] += len(lines)
+
+    names = {"#p": "progress"}
+    values: Dict[str, Any] = {":t": iso_now(), ":n": state["count"]}
+    expr = ["updatedAt = :t", "progressCount = :n"]
+
+    spill = state["spill"]
+    if len(spill) >= PROGRESS_MAX_ENTRIES or (final and spill):
+        names["#o"] = f"progress_overflow_{state['chunks']}"
+        values[":overflow"] = zlib.compress(json.dumps(spill).encode("utf-8"))
+        expr.append("#o = :overflow")
+
+    rewrite = ":overflow" in values or state["since_rewrite"] >= PROGRESS_RING_REWRITE_LINES
+    if state["count"] > PROGRESS_MAX_ENTRIES and (rewrite or final):
+        values[":ring"] = list(ring)
+        expr.append("#p = :ring")
+    elif lines:
+        values[":empty"] = []
+        values[":line"] = lines
+        expr.append("#p = list_append(if_not_exists(#p, :empty), :line)")
+    elif ":overflow" not in values:
+        return
+
+    try:
+        table.update_item(
+            Key={"userId": user_id, "itineraryId": _job_sk(request_id)},
+            UpdateExpression="SET " + ", ".join(expr),
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values,
+        )
+    except Exception:
+        log.exception("[job] append_progress error")
+        return
+    if ":overflow" in values:
+        state["chunks"] += 1
+        state["spill"] = []
+    if ":ring" in values:
+        state["since_rewrite"] = 0
+
+def _flush_all_progress() -> None:
+    with _progress_write_lock:
+        with _progress_lock:
+            pending = dict(_progress_buffer)
+            _progress_buffer.clear()
+        for (user_id, request_id), lines in pending.items():
+            _write_progress(user_id, request_id, lines)
+
+def _progress_flush_loop() -> None:
+    while True:
+        _progress_wakeup.wait(PROGRESS_FLUSH_INTERVAL)
+        _progress_wakeup.clear()
+        _flush_all_progress()
+
+def _ensure_progress_flusher() -> None:
+    if _progress_flusher["thread"] is not None:
+        return
+    with _progress_lock:
+        if _progress_flusher["thread"] is None:
+            t = threading.Thread(target=_progress_flush_loop, name="job-progress-flush", daemon=True)
+            t.start()
+            _progress_flusher["thread"] = t
+
+def flush_progress(user_id: str, request_id: str, final: bool = False) -> None:
+    """
+    Synchronously write any buffered progress lines for one job.
+    With final=True, also trim the ring, spill pending overflow and drop the job's state.
+    """
+    with _progress_write_lock:
+        with _progress_lock:
+            lines = _progress_buffer.pop((user_id, request_id), None)
+        if lines or (final and (user_id, request_id) in _progress_state):
+            _write_progress(user_id, request_id, lines or [], final=final)
+        if final:
+            _progress_state.pop((user_id, request_id), None)
+
 def append_progress(user_id: str, request_id: str, line: str) -> None:
     """
-    Append a progress line and update updatedAt. Best-effort (never raises).
+    Queue a progress line for the job. Lines are coalesced and written every
+    PROGRESS_FLUSH_INTERVAL seconds or PROGRESS_FLUSH_MAX_LINES lines, whichever
+    comes first. Best-effort (never raises).
     """
     try:
         line = (line or "").strip()
@@ -53,16 +178,13 @@ def append_progress(user_id: str, request_id: str, line: str) -> None:
         if len(line) > 600:
             line = line[:600] + " ..."
 
-        table.update_item(
-            Key={"userId": user_id, "itineraryId": _job_sk(request_id)},
-            UpdateExpression="SET #p = list_append(if_not_exists(#p, :empty), :line), updatedAt = :t",
-            ExpressionAttributeNames={"#p": "progress"},
-            ExpressionAttributeValues={
-                ":empty": [],
-                ":line": [f"{time.strftime('%H:%M:%S')}  {line}"],
-                ":t": iso_now(),
-            },
-        )
+        _ensure_progress_flusher()
+        with _progress_lock:
+            buf = _progress_buffer.setdefault((user_id, request_id), [])
+            buf.append(f"{time.strftime('%H:%M:%S')}  {line}")
+            full = len(buf) >= PROGRESS_FLUSH_MAX_LINES
+        if full:
+            _progress_wakeup.set()
     except Exception:
         log.exception("[job] append_progress error")
 
@@ -70,6 +192,7 @@ def complete_job(user_id: str, request_id: str, status: str, final_message: Opti
     """
     Mark the job as SUCCEEDED/FAILED and store final outputs. Best-effort.
     """
+    flush_progress(user_id, request_id, final=True)
     try:
         expr = ["#s = :s", "completedAt = :t", "updatedAt = :t"]
         names = {"#s": "status"}
@@ -87,7 +210,7 @@ def complete_job(user_id: str, request_id: str, status: str, final_message: Opti
             ExpressionAttributeNames=names,
             ExpressionAttributeValues=vals,
         )
-        log.info(f"[job] completed userId={user_id} requestId={request_id} status={status} iid={itinerary_id}")
+        log.info("[job] completed userId=%s requestId=%s status=%s iid=%s", user_id, request_id, status, itinerary_id)
     except Exception:
         log.exception("[job] complete_job error")
 
@@ -95,12 +218,55 @@ class JobProgressHandler(logging.Handler):
     """
     Optional log-mirror. Attach to root logger during a job to mirror concise lines to DDB.
     """
+    PREFIXES = ("STATUS:", "TOOL:", "TOOL_RESULT:", "Tool #")
+
     def __init__(self, user_id: str, request_id: str, level=logging.INFO):
         super().__init__(level=level)
         self.user_id = user_id
         self.request_id = request_id
+        self.addFilter(lambda record: record.getMessage().startswith(self.PREFIXES))
 
     def emit(self, record: logging.LogRecord) -> None:
-        msg = self.format(record)
-        if any(msg.startswith(pfx) for pfx in ("STATUS:", "TOOL:", "TOOL_RESULT:", "Tool #")):
-            append_progress(self.user_id, self.request_id, msg)
+        append_progress(self.user_id, self.request_id, self.format(record))
+
+
+_mirrored_job: "contextvars.ContextVar[Optional[Tuple[str, str]]]" = contextvars.ContextVar(
+    "mirrored_job", default=None
+)
+
+
+@contextlib.contextmanager
+def mirror_progress(user_id: str, request_id: str):
+    """
+    Mirror progress log lines to the job record for the duration of the block.
+    Records go through a QueueHandler so the logging thread never waits on DynamoDB;
+    a QueueListener drains them into JobProgressHandler in the background.
+    Only records logged from this request's context are mirrored, so concurrent
+    invocations don't see each other's lines.
+    """
+    job = (user_id, request_id)
+    token = _mirrored_job.set(job)
+    q: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+    queue_handler = logging.handlers.QueueHandler(q)
+    queue_handler.setLevel(logging.INFO)
+    queue_handler.addFilter(
+        lambda record: _mirrored_job.get() == job
+        and record.getMessage().startswith(JobProgressHandler.PREFIXES)
+    )
+    listener = logging.handlers.QueueListener(
+        q, JobProgressHandler(user_id, request_id), respect_handler_level=True
+    )
+    root = logging.getLogger()
+    root.addHandler(queue_handler)
+    listener.start()
+    try:
+        yield
+    finally:
+        root.removeHandler(queue_handler)
+        listener.stop()
+        flush_progress(user_id, request_id, final=True)
+        try:
+            _mirrored_job.reset(token)
+        except ValueError:
+            # Async generators can be finalized from a different context.
+            _mirrored_job.set(None)
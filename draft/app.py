@@ -9,6 +9,7 @@ from typing import Dict, Any, List
 
 import boto3
 from botocore.exceptions import ClientError
+from boto3.dynamodb.conditions import Key
 
 from bedrock_agentcore.runtime import BedrockAgentCoreApp
 from strands import Agent, tool
@@ -96,7 +97,6 @@ def get_itineraries(userId: str, limit: int = 10) -> List[Dict[str, Any]]:
     Fetch recent itineraries for a user.
     """
     log.info(f"[tool] get_itineraries(userId={userId}, limit={limit})")
-    from boto3.dynamodb.conditions import Key
     resp = table.query(
         KeyConditionExpression=Key("userId").eq(userId),
         Limit=limit,
@@ -131,20 +131,28 @@ Quality:
 - Include source URLs in "sources".
 """
 
-model = BedrockModel(
-    model_id=MODEL_ID,
-    region_name=AWS_REGION,
-    max_tokens=2000,
-    temperature=0.3,
-    streaming=True,
-    include_tool_result_status=True
-)
+_agent = None
 
-agent = Agent(
-    system_prompt=SYSTEM_PROMPT,
-    tools=[http_request, save_itinerary, get_itineraries],
-    model=model
-)
+def _get_agent() -> Agent:
+    """
+    Build the model + agent on first use so importing this module stays cheap.
+    """
+    global _agent
+    if _agent is None:
+        model = BedrockModel(
+            model_id=MODEL_ID,
+            region_name=AWS_REGION,
+            max_tokens=2000,
+            temperature=0.3,
+            streaming=True,
+            include_tool_result_status=True
+        )
+        _agent = Agent(
+            system_prompt=SYSTEM_PROMPT,
+            tools=[http_request, save_itinerary, get_itineraries],
+            model=model
+        )
+    return _agent
 
 # ----------------- AgentCore entrypoint -----------------
 @app.entrypoint
@@ -183,7 +191,7 @@ def invoke(payload: Dict[str, Any]) -> Dict[str, Any]:
         )
 
         # The Strands Agent streams tokens & tool-status; your client will see these live via SSE.
-        result = agent(f"{planning_context}\n\nUser request: {nl_query}")
+        result = _get_agent()(f"{planning_context}\n\nUser request: {nl_query}")
 
         # Compact response for non-streaming clients
         return {
@@ -204,4 +212,5 @@ def invoke(payload: Dict[str, Any]) -> Dict[str, Any]:
         }
 
 if __name__ == "__main__":
+    _get_agent()
     app.run()
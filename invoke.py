@@ -1,7 +1,6 @@
 # invoke.py
 import argparse
 import json
-import sys
 import uuid
 
 import boto3
@@ -21,8 +20,16 @@ def print_json_stream_or_body(resp):
                 text = str(raw)
             if text.startswith("data: "):
                 text = text[6:]
-            print(text)
-            sys.stdout.flush()
+            # Each frame is one JSON-encoded yield: a text fragment, or an error dict.
+            try:
+                chunk = json.loads(text)
+            except ValueError:
+                chunk = text
+            if isinstance(chunk, str):
+                print(chunk, end="", flush=True)
+            else:
+                print("\n" + json.dumps(chunk, indent=2), flush=True)
+        print()
     else:
         body = resp.get("response")
         print(body.read().decode("utf-8"))
@@ -33,9 +40,10 @@ def main():
     parser.add_argument("--arn", required=True, help="Agent Runtime ARN")
     parser.add_argument("--region", default="us-east-1")
     parser.add_argument("--timeout", type=int, default=300)
+    parser.add_argument("--stream", action="store_true", help="Stream model text as it is generated instead of waiting for the JSON result")
     args = parser.parse_args()
 
-    user_id = input("userId: ").strip() or f"u-{uuid.uuid4()}"
+    user_id = input("userId: ").strip() or f"u-{uuid.uuid4().hex}"
     destination = input("destination (City, Country): ").strip()
     start_date = input("startDate (YYYY-MM-DD): ").strip()
     end_date = input("endDate (YYYY-MM-DD): ").strip()
@@ -51,12 +59,13 @@ def main():
 
     payload = {
         "userId": user_id,
-        "requestId": str(uuid.uuid4()),
+        "requestId": uuid.uuid4().hex,
         "prompt": prompt or f"Plan a trip to {destination} from {start_date} to {end_date}. Preferences: {preferences}",
         "destination": destination,
         "startDate": start_date,
         "endDate": end_date,
         "preferences": preferences,
+        "stream": args.stream,
     }
 
     resp = client.invoke_agent_runtime(
@@ -65,6 +74,8 @@ def main():
         payload=json.dumps(payload).encode("utf-8"),
     )
     print_json_stream_or_body(resp)
+    if args.stream:
+        print(f"userId={payload['userId']} requestId={payload['requestId']}")
 
 
 if __name__ == "__main__":
@@ -1,58 +1,123 @@
 
+import functools
+import gzip
 import json
+import threading
 import time
 import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
 import re
-from typing import Dict, Any, List
+import sys
+from typing import Dict, Any, List, Tuple
 
 import boto3
 from botocore.config import Config
 import streamlit as st
 
+try:
+    import orjson
 
-def _client(region: str, timeout: int) -> Any:
-    cfg = Config(
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+except ImportError:  # stdlib fallback
+    def _json_dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+    _json_loads = json.loads
+
+
+def _config(timeout: int) -> Config:
+    return Config(
         connect_timeout=10,
         read_timeout=timeout,
-        retries={"max_attempts": 2, "mode": "standard"},
+        retries={"max_attempts": 4, "mode": "standard"},
+        max_pool_connections=20,
     )
-    return boto3.client("bedrock-agentcore", region_name=region, config=cfg)
 
 
-def _invoke(arn: str, client, payload: Dict[str, Any]) -> Dict[str, Any]:
+def _accept_gzip(request, **kwargs) -> None:
+    request.headers["Accept-Encoding"] = "gzip"
+
+
+def _enable_gzip(client) -> None:
+    client.meta.events.register("before-send.bedrock-agentcore.InvokeAgentRuntime", _accept_gzip)
+
+
+def _decompress(resp: Dict[str, Any], data: bytes) -> bytes:
+    # botocore reads bodies with decode_content=False, so gzip is undone here.
+    headers = resp.get("ResponseMetadata", {}).get("HTTPHeaders", {})
+    if "gzip" in headers.get("content-encoding", ""):
+        return gzip.decompress(data)
+    return data
+
+
+@st.cache_resource
+def _client(region: str, timeout: int) -> Any:
+    # Cached across reruns and sessions so the keep-alive connection pool is reused.
+    client = boto3.client("bedrock-agentcore", region_name=region, config=_config(timeout))
+    _enable_gzip(client)
+    return client
+
+
+def new_session_id() -> str:
+    # AgentCore requires runtimeSessionId to be at least 33 characters, so keep the hyphenated form.
+    return str(uuid.uuid4())
+
+
+def _encode_payload(payload: Dict[str, Any] | bytes) -> bytes:
+    return payload if isinstance(payload, bytes) else _json_dumps(payload)
+
+
+def _invoke(arn: str, client, payload: Dict[str, Any] | bytes, session_id: str | None = None) -> Dict[str, Any]:
+    session_id = session_id or new_session_id()
     resp = client.invoke_agent_runtime(
         agentRuntimeArn=arn,
-        runtimeSessionId=str(uuid.uuid4()),
-        payload=json.dumps(payload).encode("utf-8"),
+        runtimeSessionId=session_id,
+        payload=_encode_payload(payload),
     )
     return _parse_json(_read_body(resp))
 
 
+def _body_text(resp: Dict[str, Any], data: bytes) -> str:
+    """
+    Decode a response body. SSE lines are joined in one bytearray (blank keep-alive
+    lines dropped) and decoded once at the end.
+    """
+    data = _decompress(resp, data)
+    if "text/event-stream" not in resp.get("contentType", ""):
+        return data.decode("utf-8")
+    buf = bytearray()
+    for raw in data.splitlines():
+        if raw:
+            buf += raw
+            buf += b"\n"
+    return buf[:-1].decode("utf-8")
+
+
 def _read_body(resp: Dict[str, Any]) -> str:
-    content_type = resp.get("contentType", "")
-    if "text/event-stream" in content_type:
-        body: List[str] = []
-        for raw in resp["response"].iter_lines(chunk_size=1):
-            if raw:
-                body.append(raw.decode("utf-8"))
-        return "\n".join(body)
     body_obj = resp.get("response")
     if hasattr(body_obj, "read"):
-        return body_obj.read().decode("utf-8")
+        return _body_text(resp, body_obj.read())
     return str(body_obj)
 
 
+_JSON_START = frozenset('{"')
+
+
 def _parse_json(body: str) -> Dict[str, Any]:
+    stripped = body.lstrip()
+    if not stripped or stripped[0] not in _JSON_START:
+        return {"_raw": body}
     try:
-        parsed = json.loads(body)
+        parsed = _json_loads(body)
         if isinstance(parsed, str):
-            return json.loads(parsed)
-        return parsed
+            parsed = _json_loads(parsed)
     except Exception:
         return {"_raw": body}
+    return parsed if isinstance(parsed, dict) else {"_raw": body}
 
 
-def launch_job(client, arn: str, region: str, timeout: int, user_inputs: Dict[str, str]) -> Dict[str, Any]:
+def launch_job(client, arn: str, region: str, timeout: int, user_inputs: Dict[str, str], session_id: str | None = None) -> Dict[str, Any]:
     payload = {
         "action": "start",
         "userId": user_inputs["user_id"],
@@ -66,15 +131,22 @@ def launch_job(client, arn: str, region: str, timeout: int, user_inputs: Dict[st
         "endDate": user_inputs["end"],
         "preferences": user_inputs["preferences"],
     }
-    return _invoke(arn, client, payload)
+    return _invoke(arn, client, payload, session_id)
+
 
+@functools.lru_cache(maxsize=32)
+def _status_payload(user_id: str, request_id: str) -> bytes:
+    # The ids never change for a job, so encode them once and splice them in.
+    invariant = _json_dumps({"userId": user_id, "requestId": request_id})[1:-1]
+    return b'{"action":"status",' + invariant + b"}"
 
-def poll_status(client, arn: str, user_id: str, request_id: str) -> Dict[str, Any]:
-    payload = {"action": "status", "userId": user_id, "requestId": request_id}
-    return _invoke(arn, client, payload)
 
+def poll_status(client, arn: str, user_id: str, request_id: str, session_id: str | None = None) -> Dict[str, Any]:
+    return _invoke(arn, client, _status_payload(user_id, request_id), session_id)
 
-TRACE_PATTERN = re.compile(r"^(STATUS|TOOL|TOOL_RESULT|RESULT):.*", re.MULTILINE)
+
+TRACE_PATTERN = re.compile(r"^(?:STATUS|TOOL|TOOL_RESULT|RESULT):[^\n]*", re.MULTILINE)
+TRACE_PREFIX = re.compile(r"(?:STATUS|TOOL|TOOL_RESULT|RESULT):")
 
 
 def extract_trace(final_text: str) -> List[str]:
@@ -82,16 +154,149 @@ def extract_trace(final_text: str) -> List[str]:
         return []
     matches = TRACE_PATTERN.findall(final_text)
     if matches:
-        return [m.group(0) for m in TRACE_PATTERN.finditer(final_text)]
+        return matches
     
     lines = []
     for line in final_text.splitlines():
         stripped = line.strip()
-        if stripped.startswith(("STATUS:", "TOOL:", "TOOL_RESULT:", "RESULT:")):
+        if TRACE_PREFIX.match(stripped):
             lines.append(stripped)
     return lines
 
 
+MAX_POLL_FAILURES = 3
+POLL_LEAD_MARGIN = 0.1
+
+
+def _poll_executor() -> ThreadPoolExecutor:
+    # One worker per browser session: a session only ever has one job in flight, and a
+    # slow poll in one session must not queue behind another's. Idle workers exit once
+    # the session (and with it the executor) is garbage-collected.
+    executor = st.session_state.get("poll_executor")
+    if executor is None:
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="status-poll")
+        st.session_state.poll_executor = executor
+    return executor
+
+
+def _timed_poll(job_state: Dict[str, Any], client, start_at: float) -> Dict[str, Any]:
+    # Hold the request until `start_at` so its answer is fresh when the next tick reads it.
+    if job_state["cancel"].wait(max(0.0, start_at - time.monotonic())):
+        raise RuntimeError("status poll cancelled")
+    started = time.monotonic()
+    data = poll_status(client, job_state["arn"], job_state["user_id"], job_state["request_id"], job_state["session_id"])
+    rtt = time.monotonic() - started
+    job_state["rtt"] = rtt if job_state.get("rtt") is None else 0.7 * job_state["rtt"] + 0.3 * rtt
+    return data
+
+
+def _submit_poll(job_state: Dict[str, Any], start_at: float = 0.0) -> Future:
+    client = _client(job_state["region"], job_state["timeout"])
+    return _poll_executor().submit(_timed_poll, job_state, client, start_at)
+
+
+def _job_from_status(data: Any) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Pull (job, progress) out of a status response, raising ValueError if it isn't shaped
+    like one so the poll counts as failed instead of crashing the fragment.
+    """
+    if not isinstance(data, dict):
+        raise ValueError(f"unexpected status response: {str(data)[:200]}")
+    job = data.get("job") or {}
+    if not isinstance(job, dict):
+        raise ValueError(f"unexpected job record: {str(job)[:200]}")
+    progress = job.get("progress") or []
+    if not isinstance(progress, list):
+        raise ValueError(f"unexpected progress field: {type(progress).__name__}")
+    return job, progress
+
+
+def _poll_once(job_state: Dict[str, Any]) -> None:
+    """
+    Consume the in-flight poll and schedule the next one to land just before the
+    following tick (one poll interval minus the observed round trip), so each tick
+    shows a status that is only a few milliseconds old.
+    """
+    tick = time.monotonic()
+    fut = job_state.get("pending") or _submit_poll(job_state)
+    job_state["pending"] = None
+    try:
+        data = fut.result()
+        job, progress = _job_from_status(data)
+    except Exception as exc:
+        # botocore has already retried; give the job a few more ticks before failing the view.
+        job_state["failures"] = job_state.get("failures", 0) + 1
+        if job_state["failures"] >= MAX_POLL_FAILURES:
+            job_state["error"] = str(exc)
+            job_state["done"] = True
+        else:
+            st.warning(f"Status poll failed ({job_state['failures']}/{MAX_POLL_FAILURES}); retrying: {exc}")
+        return
+    job_state["failures"] = 0
+    status = job.get("status")
+    status = sys.intern(status) if isinstance(status, str) else "?"
+    if status not in ("SUCCEEDED", "FAILED"):
+        lead = (job_state.get("rtt") or 0.0) + POLL_LEAD_MARGIN
+        job_state["pending"] = _submit_poll(job_state, tick + job_state["poll_interval"] - lead)
+
+    # Past the cap the job trims `progress` to its newest lines; progressCount keeps the total.
+    try:
+        total = int(job.get("progressCount", len(progress)))
+    except (TypeError, ValueError):
+        total = len(progress)
+    fresh = total - job_state["seen"]
+    if fresh > 0:
+        job_state["seen"] = total
+        new_lines = progress[-fresh:] if fresh < len(progress) else progress
+        st.session_state.progress_md += "".join(f"- {line}\n" for line in new_lines)
+    job_state["status"] = status
+    if status in ("SUCCEEDED", "FAILED"):
+        job_state["data"] = data
+        job_state["done"] = True
+
+
+def _job_progress() -> None:
+    job_state = st.session_state.job
+    was_done = job_state["done"]
+    if not was_done:
+        _poll_once(job_state)
+    if st.session_state.progress_md:
+        st.markdown(st.session_state.progress_md, help="Live progress as reported by the agent.")
+    st.info(f"Status: {job_state['status']}")
+    if job_state["done"] and not was_done:
+        # Full rerun: re-registers this fragment without run_every and renders the result.
+        st.rerun()
+
+
+def _render_final(job_state: Dict[str, Any]) -> None:
+    if job_state["error"]:
+        st.error(f"Error while polling job status: {job_state['error']}")
+        return
+    data = job_state["data"] or {}
+    job = data.get("job", {})
+    final_msg = job.get("finalMessage") or data.get("message") or "No final message."
+
+    trace_md = job_state.get("trace_md")
+    with ThreadPoolExecutor(max_workers=1) as ex:
+        # Scan the (possibly long) final message while the message itself renders.
+        fut = ex.submit(extract_trace, final_msg) if trace_md is None else None
+        if job_state["status"] == "SUCCEEDED":
+            st.success("Job completed successfully.")
+        else:
+            st.error("Job failed.")
+        st.markdown(f"#### Final Message\n\n{final_msg}")
+        if fut is not None:
+            trace_md = job_state["trace_md"] = "\n".join(f"- {line}" for line in fut.result())
+
+    if trace_md:
+        st.markdown("#### Thinking Trace")
+        st.markdown(trace_md)
+
+    iid = job.get("resultItineraryId")
+    if iid:
+        st.info(f"Itinerary ID: {iid}")
+
+
 def main() -> None:
     st.set_page_config(page_title="AgentCore Travel Planner", layout="wide")
     st.title("AgentCore Travel Planner")
@@ -105,7 +310,8 @@ def main() -> None:
 
     with st.form("trip_form"):
         st.subheader("Trip Details")
-        user_id = st.text_input("User ID", value=f"u-{uuid.uuid4()}").strip()
+        default_user = st.session_state.setdefault("default_user_id", f"u-{uuid.uuid4().hex}")
+        user_id = st.text_input("User ID", value=default_user).strip()
         destination = st.text_input("Destination (City, Country)")
         start_date = st.text_input("Start Date (YYYY-MM-DD)")
         end_date = st.text_input("End Date (YYYY-MM-DD)")
@@ -123,8 +329,8 @@ def main() -> None:
 
         client = _client(region, timeout)
         user_inputs = {
-            "user_id": user_id or f"u-{uuid.uuid4()}",
-            "request_id": str(uuid.uuid4()),
+            "user_id": user_id or default_user,
+            "request_id": uuid.uuid4().hex,
             "destination": destination,
             "start": start_date,
             "end": end_date,
@@ -132,61 +338,54 @@ def main() -> None:
             "prompt": prompt,
         }
 
+        session_id = new_session_id()
         with st.spinner("Submitting job to AgentCore…"):
-            ack = launch_job(client, arn, region, timeout, user_inputs)
-
-        st.write("### Job Acknowledgement")
-        st.json(ack)
-
-        result = ack.get("result")
-        job_user = ack.get("userId", user_inputs["user_id"])
-        job_request = ack.get("requestId", user_inputs["request_id"])
-
-        if result != "accepted":
-            st.error("Job was not accepted by the runtime. See acknowledgement payload above for details.")
-            return
-
-        progress_area = st.empty()
-        status_area = st.empty()
-        final_area = st.empty()
-
-        seen = 0
-        try:
-            while True:
-                data = poll_status(client, arn, job_user, job_request)
-                job = data.get("job", {})
-                progress = job.get("progress", [])
-                status = job.get("status", "?")
-                new_lines = progress[seen:]
-                if new_lines:
-                    seen = len(progress)
-                    progress_area.markdown(
-                        "\n".join(f"- {line}" for line in progress),
-                        help="Live progress as reported by the agent.",
-                    )
-                status_area.info(f"Status: {status}")
-
-                if status in ("SUCCEEDED", "FAILED"):
-                    final_msg = job.get("finalMessage") or data.get("message") or "No final message."
-                    if status == "SUCCEEDED":
-                        final_area.success("Job completed successfully.")
-                    else:
-                        final_area.error("Job failed.")
-                    final_area.markdown(f"#### Final Message\n\n{final_msg}")
-
-                    trace_lines = extract_trace(final_msg)
-                    if trace_lines:
-                        st.markdown("#### Thinking Trace")
-                        st.markdown("\n".join(f"- {line}" for line in trace_lines))
-
-                    iid = job.get("resultItineraryId")
-                    if iid:
-                        st.info(f"Itinerary ID: {iid}")
-                    break
-
-                time.sleep(poll_interval)
-        except Exception as exc:
-            st.error(f"Error while polling job status: {exc}")
+            ack = launch_job(client, arn, region, timeout, user_inputs, session_id)
+
+        st.session_state.ack = ack
+        previous = st.session_state.get("job")
+        if previous is not None:
+            # Wake a scheduled poll for the old job so it doesn't hold the worker.
+            previous["cancel"].set()
+        st.session_state.job = None
+        if ack.get("result") == "accepted":
+            st.session_state.job = {
+                "arn": arn,
+                "region": region,
+                "timeout": timeout,
+                "poll_interval": int(poll_interval),
+                "user_id": ack.get("userId", user_inputs["user_id"]),
+                "request_id": ack.get("requestId", user_inputs["request_id"]),
+                "session_id": session_id,
+                "seen": 0,
+                "status": "?",
+                "done": False,
+                "data": None,
+                "error": None,
+                "rtt": None,
+                "cancel": threading.Event(),
+            }
+            st.session_state.progress_md = ""
+            st.session_state.job["pending"] = _submit_poll(st.session_state.job)
+
+    ack = st.session_state.get("ack")
+    if ack is None:
+        return
+    st.write("### Job Acknowledgement")
+    st.json(ack)
+
+    job_state = st.session_state.get("job")
+    if job_state is None:
+        st.error("Job was not accepted by the runtime. See acknowledgement payload above for details.")
+        return
+
+    # Poll in a fragment so only this block reruns on the timer; the script thread
+    # is never parked in time.sleep and widgets stay responsive.
+    run_every = None if job_state["done"] else job_state["poll_interval"]
+    st.fragment(run_every=run_every)(_job_progress)()
+
+    if job_state["done"]:
+        _render_final(job_state)
 
 
 if __name__ == "__main__":
@@ -3,40 +3,103 @@ import argparse
 import time
 
 import boto3
+from botocore.exceptions import ClientError
+
+MIN_POLL_DELAY = 0.25
+MAX_POLL_BACKOFF = 5.0
+
+def _log_group_arn(logs, log_group):
+    if log_group.startswith("arn:"):
+        return log_group
+    resp = logs.describe_log_groups(logGroupNamePrefix=log_group)
+    for group in resp.get("logGroups", []):
+        if group["logGroupName"] == log_group:
+            return group.get("logGroupArn") or group["arn"].rstrip("*").rstrip(":")
+    raise SystemExit(f"Log group not found: {log_group}")
+
+
+def live_tail(log_group, region, pattern=None):
+    """
+    Stream events via CloudWatch Logs Live Tail (server push, no polling).
+    Returns False if the installed botocore predates StartLiveTail.
+    """
+    logs = boto3.client("logs", region_name=region)
+    if not hasattr(logs, "start_live_tail"):
+        return False
+    kwargs = dict(logGroupIdentifiers=[_log_group_arn(logs, log_group)])
+    if pattern:
+        kwargs["logEventFilterPattern"] = pattern
+
+    resp = logs.start_live_tail(**kwargs)
+    for frame in resp["responseStream"]:
+        if "sessionStart" in frame:
+            print(f"# live tail session {frame['sessionStart'].get('sessionId', '')} started")
+        elif "sessionUpdate" in frame:
+            for event in frame["sessionUpdate"].get("sessionResults", []):
+                print(event["message"].rstrip())
+    return True
 
 
 def tail(log_group, region, start_ms=None, pattern=None):
+    """
+    Poll FilterLogEvents. Each round drains every page before sleeping; rounds that
+    return events wait MIN_POLL_DELAY before the next, and idle or throttled rounds
+    back off exponentially (up to MAX_POLL_BACKOFF seconds).
+    """
     logs = boto3.client("logs", region_name=region)
-    next_token = None
     start_time = start_ms or int(time.time() - 60) * 1000
+    empty_polls = 0
 
     while True:
         kwargs = dict(logGroupName=log_group, startTime=start_time, interleaved=True)
         if pattern:
             kwargs["filterPattern"] = pattern
-        if next_token:
-            kwargs["nextToken"] = next_token
 
-        resp = logs.filter_log_events(**kwargs)
-        for event in resp.get("events", []):
-            ts = event["timestamp"]
-            msg = event["message"].rstrip()
-            print(msg)
-            if ts + 1 > start_time:
-                start_time = ts + 1
+        latest = None
+        while True:
+            try:
+                resp = logs.filter_log_events(**kwargs)
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") != "ThrottlingException":
+                    raise
+                print("# throttled by FilterLogEvents; backing off")
+                time.sleep(min(MAX_POLL_BACKOFF, MIN_POLL_DELAY * 2 ** empty_polls))
+                empty_polls = min(empty_polls + 1, 5)
+                continue
+            events = resp.get("events", [])
+            for event in events:
+                print(event["message"].rstrip())
+            if events:
+                page_latest = max(e["timestamp"] for e in events)
+                latest = page_latest if latest is None else max(latest, page_latest)
+            next_token = resp.get("nextToken")
+            if not next_token:
+                break
+            kwargs["nextToken"] = next_token
 
-        next_token = resp.get("nextToken")
-        time.sleep(1.0)
+        if latest is not None:
+            start_time = max(start_time, latest + 1)
+            empty_polls = 0
+            time.sleep(MIN_POLL_DELAY)
+        else:
+            time.sleep(min(MAX_POLL_BACKOFF, MIN_POLL_DELAY * 2 ** empty_polls))
+            empty_polls = min(empty_polls + 1, 5)
 
 
 def main():
     parser = argparse.ArgumentParser(description="Tail CloudWatch logs for an AgentCore runtime.")
-    parser.add_argument("--log-group", required=True, help="Log group name (/aws/bedrock/agentcore/runtimes/<runtime-id>)")
+    parser.add_argument("--log-group", required=True, help="Log group name (/aws/bedrock/agentcore/runtimes/<runtime-id>) or ARN")
     parser.add_argument("--region", default="us-east-1")
-    parser.add_argument("--since-seconds", type=int, default=120)
+    parser.add_argument("--since-seconds", type=int, default=120, help="History to replay (--poll mode only)")
     parser.add_argument("--filter", help="Filter pattern (e.g., requestId or sessionId)")
+    parser.add_argument("--poll", action="store_true", help="Poll FilterLogEvents instead of using Live Tail")
     args = parser.parse_args()
 
+    if not args.poll:
+        if live_tail(args.log_group, args.region, args.filter):
+            return
+        print("# start_live_tail unavailable in this boto3; falling back to polling")
+
     start_ms = int((time.time() - args.since_seconds) * 1000)
     tail(args.log_group, args.region, start_ms, args.filter)
 